@@ -1,27 +1,49 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import base64, json, os, sys, mimetypes, logging
+import argparse, asyncio, base64, glob, importlib.util, mmap, os, sys, mimetypes, logging
 from logging.handlers import RotatingFileHandler
-from datetime import datetime, timedelta
-from typing import Optional
+from datetime import date, datetime
+from functools import cached_property
+from typing import TYPE_CHECKING, Optional
 
+import orjson
 from zoneinfo import ZoneInfo
-from pydantic import BaseModel, ValidationError
-from openai import OpenAI
+from pydantic import BaseModel, ConfigDict, PrivateAttr, ValidationError
+
+# openai (+httpx) is imported lazily – it costs hundreds of ms on a Pi
+# and an early exit (no API key, bad inputs, all plants on fast path) never needs it
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
 
 # ---------- Hardcoded paths & settings ---------
-IMAGE_PATH = "./plant.jpg"
+# one subdirectory per plant (its own photo, plant.json and history);
+# without any, the working directory is the single plant
+PLANTS_GLOB = "./plants/*/"
+IMAGE_FILE = "plant.jpg"
+HISTORY_FILE = "watering_history.json"
+PLANT_FILE = "plant.json"
 WEATHER_NOW_PATH = "./weather_now.json"
 WEATHER_FORECAST_PATH = "./weather_forecast.json"
-HISTORY_PATH = "./watering_history.json"
-PLANT_PATH = "./plant.json"
+BATCH_STATE_PATH = "./batch_state.json"
 LOGFILE = "./watering.log"
 
 ROTATE_MAX_MB = 5
 ROTATE_BACKUPS = 3
 MODEL = "gpt-4o-mini"
+# plants per chat completion; groups run concurrently (1 = isolated call per plant)
+PLANTS_PER_CALL = 8
 LOCAL_TZ = ZoneInfo("Europe/Prague")
+# upcoming forecast items validated at all: at least FORECAST_MAX_ITEMS (prompt shows 12)
+# and always past the rain window, whatever the feed's step (15 min, 1 h, 6 h…)
+FORECAST_MAX_ITEMS = 24
+RAIN_WINDOW_HOURS = 12
+
+# plant.json may carry "image_url" – a stable HTTPS URL of the photo; if present it is
+# sent instead of the base64 data URL (no encoding, ~1/3 less upload, cacheable prefix)
+IMAGE_URL_KEY = "image_url"
+
+B64_CHUNK = 57 * 1024
 
 # prompt log settings (w/o base64 picture)
 LOG_PROMPT_INCLUDE_IMAGE = False
@@ -35,6 +57,8 @@ class WeatherNow(BaseModel):
     description: Optional[str] = None
 
 class WeatherForecastItem(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     time: datetime
     precip_prob_pct: Optional[float] = None
     expected_precip_mm: Optional[float] = None
@@ -42,71 +66,162 @@ class WeatherForecastItem(BaseModel):
     humidity_pct: Optional[float] = None
 
 class WeatherForecast(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
     items: list[WeatherForecastItem]
 
+    # (epoch s, precip mm) of items with known precipitation, converted once per forecast
+    @cached_property
+    def precip_points(self) -> list[tuple[float, float]]:
+        return [
+            ((it.time if it.time.tzinfo else it.time.replace(tzinfo=LOCAL_TZ)).timestamp(),
+             float(it.expected_precip_mm))
+            for it in self.items if it.expected_precip_mm is not None
+        ]
+
 class PlantContext(BaseModel):
     species: Optional[str] = None
     notes: Optional[str] = None
 
 class DecisionRequest(BaseModel):
-    image_url: str
+    id: str
+    image_url: Optional[str] = None  # filled by attach_image() only for plants sent to the model
     last_watering_date: Optional[str] = None
     last_watering_amount_ml: Optional[int] = None
     weather_now: WeatherNow
     weather_forecast: WeatherForecast
     plant: Optional[PlantContext] = None
 
+    _rain12: Optional[float] = PrivateAttr(default=None)
+    _last_watering_day: Optional[date] = PrivateAttr(default=None)  # parsed once in load_request
+    _image_path: Optional[str] = PrivateAttr(default=None)
+    _hosted_image_url: Optional[str] = PrivateAttr(default=None)
+
 class DecisionResponse(BaseModel):
+    model_config = ConfigDict(extra="forbid")  # → additionalProperties: false (strict schema)
+
+    id: str
     zalevat: bool
     oduvodneni: str
 
+class DecisionBatch(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    decisions: list[DecisionResponse]
+
 # ---------- Helpers ----------
 def file_to_data_url(path: str) -> str:
     mime, _ = mimetypes.guess_type(path)
     if not mime or not mime.startswith("image/"):
         raise ValueError(f"Soubor '{path}' musí být obrázek (image/*).")
-    with open(path, "rb") as f:
-        b64 = base64.b64encode(f.read()).decode("ascii")
-    return f"data:{mime};base64,{b64}"
+    size = os.path.getsize(path)
+    if size == 0:
+        raise ValueError(f"Soubor '{path}' je prázdný.")
+    # mmap → pages read on demand, no raw-bytes copy; chunk is a multiple of 3
+    # → no "=" padding mid-stream
+    out = bytearray(f"data:{mime};base64,".encode("ascii"))
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        view = memoryview(mm)
+        try:
+            for i in range(0, size, B64_CHUNK):
+                out += base64.b64encode(view[i:i + B64_CHUNK])
+        finally:
+            view.release()  # mmap can't close while a view is exported
+    return out.decode("ascii")
+
+def image_reference(path: str, url: Optional[str]) -> str:
+    if url:
+        if not url.startswith("https://"):
+            raise ValueError(f"'{IMAGE_URL_KEY}' musí být HTTPS URL: {url}")
+        return url
+    return file_to_data_url(path)
 
 def load_json_or_default(path: str, default, required: bool = False):
     if not os.path.exists(path):
         if required:
             raise FileNotFoundError(f"Soubor '{path}' neexistuje.")
         return default
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-def days_since(date_str: Optional[str]) -> Optional[int]:
+    with open(path, "rb") as f:
+        return orjson.loads(f.read())
+
+def trim_forecast_items(items: list, now: datetime) -> list:
+    # drop items already in the past (feeds may start at midnight, include past days, or be
+    # yesterday's file); stop once we have FORECAST_MAX_ITEMS *and* an item past the rain window
+    start = now.timestamp()
+    horizon = start + RAIN_WINDOW_HOURS * 3600
+    kept = []
+    for it in items:
+        try:
+            t = datetime.fromisoformat(str(it["time"]).replace("Z", "+00:00"))
+            ts = (t if t.tzinfo else t.replace(tzinfo=LOCAL_TZ)).timestamp()
+        except (KeyError, TypeError, ValueError):
+            kept.append(it)  # malformed item: keep it, validation will report it
+            continue
+        if ts < start:
+            continue
+        kept.append(it)
+        if len(kept) >= FORECAST_MAX_ITEMS and ts > horizon:
+            break
+    return kept
+
+def parse_watering_day(date_str: Optional[str]) -> Optional[date]:
     if not date_str:
         return None
     try:
-        dt = datetime.fromisoformat(date_str.replace("Z", "+00:00")).astimezone(LOCAL_TZ).date()
-        return (datetime.now(LOCAL_TZ).date() - dt).days
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00")).astimezone(LOCAL_TZ).date()
     except Exception:
         return None
 
-def precip_sum_next_hours(forecast: WeatherForecast, hours: int) -> float:
-    now = datetime.now(LOCAL_TZ)
-    end = now + timedelta(hours=hours)
-    total = 0.0
-    for it in forecast.items:
-        t = it.time
-        if t.tzinfo is None:
-            t = t.replace(tzinfo=LOCAL_TZ)
-        else:
-            t = t.astimezone(LOCAL_TZ)
-        if now <= t <= end and it.expected_precip_mm is not None:
-            total += float(it.expected_precip_mm)
-    return total
+def days_since(day: Optional[date], now: datetime) -> Optional[int]:
+    return None if day is None else (now.date() - day).days
+
+def precip_sum_next_hours(forecast: WeatherForecast, hours: int, now: datetime) -> float:
+    start = now.timestamp()
+    end = start + hours * 3600
+    return sum((mm for t, mm in forecast.precip_points if start <= t <= end), 0.0)
+
+# spočteno jednou na požadavek, prompt i guard pak vidí stejnou hodnotu
+def rain_next_12h(req: DecisionRequest, now: datetime) -> float:
+    if req._rain12 is None:
+        req._rain12 = precip_sum_next_hours(req.weather_forecast, RAIN_WINDOW_HOURS, now)
+    return req._rain12
 
 # ---------- Prompt ----------
-def build_messages(payload: DecisionRequest) -> list:
-    today_label = datetime.now(LOCAL_TZ).strftime("%Y-%m-%d")
+# static part first and byte-identical across runs → OpenAI prefix cache can hit
+SYSTEM_PROMPT = (
+    "Rozhodni, zda **dnes** zalít rostlinu. POVINNÝ checklist: "
+    "(1) fotka – známky přemokření/usušení, "
+    "(2) DNY OD POSLEDNÍ ZÁLIVKY a POSLEDNÍ OBJEM (použij přesně tato FAKTA), "
+    "(3) dnešní teplota a vlhkost (odpar), "
+    "(4) srážky z předpovědi počasí na příštích 12 hodin. "
+    "Pokud z faktů vyplývá horko (≥30 °C) a suchý vzduch (≤40 % RH) a poslední zálivka ≥1 den a déšť <2 mm/12 h, "
+    "pak nezalévat lze jen s JASNÝM důvodem (např. velmi velká dávka včera, blízký výrazný déšť). "
+    "Jinak zvol zalít. "
+    "Každá rostlina má vlastní zprávu (fotka, id, fakta). "
+    "Odpověz **jen** jako JSON s jednou položkou pro každou rostlinu: "
+    '{"decisions": [{"id": "<id rostliny>", "zalevat": <true|false>, "oduvodneni": "<stručné, konkrétní>"}]} '
+    "Nesmíš si odporovat (např. horko+sucho bez brzkého deště a přesto nezalévat bez důvodu)."
+)
+# built once at import, shared by every request (treat as read-only)
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+def _fmt_forecast(items: list[WeatherForecastItem]) -> str:
+    # compact CSV instead of dict reprs – several times fewer prompt tokens
+    def num(v: Optional[float], fmt: str) -> str:
+        return "" if v is None else format(v, fmt)
+    rows = ["čas,mm,p%,°C,rh%"]
+    for it in items:
+        t = it.time if it.time.tzinfo is None else it.time.astimezone(LOCAL_TZ)
+        rows.append(f"{t:%d.%m %H:%M},{num(it.expected_precip_mm, '.1f')},{num(it.precip_prob_pct, '.0f')},"
+                    f"{num(it.temp_c, '.0f')},{num(it.humidity_pct, '.0f')}")
+    return "\n".join(rows)
+
+def plant_content(payload: DecisionRequest, now: datetime) -> list:
+    today_label = now.strftime("%Y-%m-%d")
 
     # tvrdá fakta pro model
-    dsl = days_since(payload.last_watering_date)
-    rain12 = precip_sum_next_hours(payload.weather_forecast, 12)
+    dsl = days_since(payload._last_watering_day, now)
+    rain12 = rain_next_12h(payload, now)
     facts = {
         "days_since_last_watering": dsl,
         "last_watering_amount_ml": payload.last_watering_amount_ml,
@@ -115,62 +230,181 @@ def build_messages(payload: DecisionRequest) -> list:
         "now_rh_pct": payload.weather_now.humidity_pct
     }
 
-    system = (
-        f"Dnes je {today_label} ráno. "
-        "Rozhodni, zda **dnes** zalít rostlinu. POVINNÝ checklist: "
-        "(1) fotka – známky přemokření/usušení, "
-        "(2) DNY OD POSLEDNÍ ZÁLIVKY a POSLEDNÍ OBJEM (použij přesně tato FAKTA), "
-        "(3) dnešní teplota a vlhkost (odpar), "
-        "(4) srážky z předpovědi počasí na příštích 12 hodin. "
-        "Pokud z faktů vyplývá horko (≥30 °C) a suchý vzduch (≤40 % RH) a poslední zálivka ≥1 den a déšť <2 mm/12 h, "
-        "pak nezalévat lze jen s JASNÝM důvodem (např. velmi velká dávka včera, blízký výrazný déšť). "
-        "Jinak zvol zalít. "
-        "Odpověz **jen** jako JSON: "
-        '{"zalevat": <true|false>, "oduvodneni": "<stručné, konkrétní"} '
-        "Nesmíš si odporovat (např. horko+sucho bez brzkého deště a přesto nezalévat bez důvodu)."
+    plant_text = (
+        f"Rostlina id={payload.id}\n"
+        f"Kontext rostliny: {payload.plant.model_dump_json() if payload.plant else 'neznámý'}"
     )
 
-    user_text = (
+    facts_text = (
+        f"Dnes je {today_label} ráno.\n\n"
         f"FAKTA: {facts}\n\n"
         f"Poslední zálivka (ISO): {payload.last_watering_date} "
         f"({payload.last_watering_amount_ml or 'neznámý'} ml)\n\n"
-        f"Kontext rostliny: {payload.plant.model_dump_json() if payload.plant else 'neznámý'}\n\n"
-        f"Aktuální počasí: {payload.weather_now.model_dump()}\n\n"
-        f"Předpověď (prvních 12): {[i.model_dump() for i in payload.weather_forecast.items[:12]]}"
+        f"Aktuální počasí: {payload.weather_now.model_dump_json(exclude_none=True)}\n\n"
+        f"Předpověď (prvních 12, CSV, prázdné = neznámé):\n{_fmt_forecast(payload.weather_forecast.items[:12])}"
     )
 
+    # statické → polo-statické → proměnlivé (sdílený prefix jde z cache)
     return [
-        {"role": "system", "content": system},
-        {"role": "user", "content": [
-            {"type": "text", "text": user_text},
-            {"type": "image_url", "image_url": {"url": payload.image_url}},
-        ]},
+        {"type": "image_url", "image_url": {"url": payload.image_url}},
+        {"type": "text", "text": plant_text},
+        {"type": "text", "text": facts_text},
     ]
 
-def serialize_messages_for_log(messages: list, include_image: bool) -> str:
-    def scrub(o):
-        if isinstance(o, dict):
-            d = {}
-            for k, v in o.items():
-                if k == "image_url" and isinstance(v, dict) and "url" in v and not include_image:
-                    d[k] = {"url": "<image-data-url-redacted>"}
+def build_messages(payloads: list[DecisionRequest], now: datetime) -> list:
+    # společný system prompt jednou, pak jedna user zpráva na rostlinu
+    return [SYSTEM_MESSAGE] + [
+        {"role": "user", "content": plant_content(p, now)} for p in payloads
+    ]
+
+def _scrub_images(obj):
+    # iterative copy with image URLs redacted; the original messages go to the API untouched
+    root = [None]
+    stack = [(obj, root, 0)]
+    while stack:
+        src, parent, key = stack.pop()
+        if isinstance(src, dict):
+            dst = parent[key] = {}
+            for k, v in src.items():
+                if k == "image_url" and isinstance(v, dict) and "url" in v:
+                    dst[k] = {"url": "<image-data-url-redacted>"}
+                elif isinstance(v, (dict, list)):
+                    dst[k] = None  # placeholder keeps key order
+                    stack.append((v, dst, k))
+                else:
+                    dst[k] = v
+        elif isinstance(src, list):
+            dst = parent[key] = [None] * len(src)
+            for i, v in enumerate(src):
+                if isinstance(v, (dict, list)):
+                    stack.append((v, dst, i))
                 else:
-                    d[k] = scrub(v)
-            return d
-        if isinstance(o, list): return [scrub(x) for x in o]
-        return o
-    return json.dumps(scrub(messages), ensure_ascii=False, indent=2)
+                    dst[i] = v
+        else:
+            parent[key] = src
+    return root[0]
+
+def serialize_messages_for_log(messages: list, include_image: bool) -> str:
+    return orjson.dumps(messages if include_image else _scrub_images(messages), option=orjson.OPT_INDENT_2).decode()
 
 # ---------- Open AI API Call ----------
-def call_openai(messages: list, model: str) -> DecisionResponse:
-    logging.info("PROMPT_MESSAGES:\n%s", serialize_messages_for_log(messages, LOG_PROMPT_INCLUDE_IMAGE))
-    client = OpenAI()
-    resp = client.chat.completions.create(
+# one client per process: TLS/DNS set up once, keep-alive pool shared by all plants and calls
+_client: Optional["AsyncOpenAI"] = None
+
+def _get_client() -> "AsyncOpenAI":
+    global _client
+    if _client is None:
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+        _client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(
+            http2=importlib.util.find_spec("h2") is not None,  # httpx needs h2 for HTTP/2
+            limits=httpx.Limits(max_keepalive_connections=8),
+        ))
+    return _client
+
+# structured output: the model is constrained to this schema, no malformed JSON
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "decisions", "schema": DecisionBatch.model_json_schema(), "strict": True},
+}
+
+def completion_body(messages: list, model: str) -> dict:
+    return dict(
         model=model, messages=messages, temperature=0.0,
-        response_format={"type": "json_object"}, max_tokens=400,
+        response_format=RESPONSE_FORMAT, max_tokens=400 * (len(messages) - 1),
+    )
+
+def _parse_tolerant(text: str):
+    # fallback for stray ```json fences / text around the object
+    text = text.strip().strip("`")
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError(f"Odpověď neobsahuje JSON objekt: {text[:200]!r}")
+    return orjson.loads(text[start:end + 1])
+
+def parse_decisions(content: Optional[str]) -> list[DecisionResponse]:
+    if not content:
+        raise ValueError("Prázdná odpověď modelu.")
+    try:
+        data = orjson.loads(content)
+    except orjson.JSONDecodeError:
+        data = _parse_tolerant(content)
+    return DecisionBatch.model_validate(data).decisions
+
+async def call_openai(messages: list, model: str) -> list[DecisionResponse]:
+    logging.info("PROMPT_MESSAGES:\n%s", serialize_messages_for_log(messages, LOG_PROMPT_INCLUDE_IMAGE))
+    client = _get_client()
+    resp = await client.chat.completions.create(**completion_body(messages, model))
+    msg = resp.choices[0].message
+    if getattr(msg, "refusal", None):
+        raise RuntimeError(f"Model odmítl odpovědět: {msg.refusal}")
+    return parse_decisions(msg.content)
+
+# ---------- Open AI Batch API (≈½ ceny, výsledek do 24 h) ----------
+async def submit_batch(groups: list[list[DecisionRequest]], model: str, now: datetime) -> str:
+    # never overwrite the id of a batch that hasn't been collected yet
+    if os.path.exists(BATCH_STATE_PATH):
+        pending = load_json_or_default(BATCH_STATE_PATH, {}).get("batch_id")
+        raise RuntimeError(f"Batch {pending} ještě nebyl vyzvednut, nejdřív spusť --collect.")
+    lines = []
+    for i, g in enumerate(groups):
+        messages = build_messages(g, now)
+        logging.info("PROMPT_MESSAGES:\n%s", serialize_messages_for_log(messages, LOG_PROMPT_INCLUDE_IMAGE))
+        lines.append(orjson.dumps({
+            "custom_id": f"group-{i}", "method": "POST", "url": "/v1/chat/completions",
+            "body": completion_body(messages, model),
+        }))
+    client = _get_client()
+    batch_file = await client.files.create(
+        file=("batch.jsonl", b"\n".join(lines)), purpose="batch",
     )
-    data = json.loads(resp.choices[0].message.content)
-    return DecisionResponse(**data)
+    batch = await client.batches.create(
+        input_file_id=batch_file.id, endpoint="/v1/chat/completions", completion_window="24h",
+    )
+    # plant ids kept so --collect can tell which plants got no decision
+    plant_ids = [r.id for g in groups for r in g]
+    with open(BATCH_STATE_PATH, "wb") as f:
+        f.write(orjson.dumps({"batch_id": batch.id, "plant_ids": plant_ids}))
+    return batch.id
+
+BATCH_RUNNING = ("validating", "in_progress", "finalizing", "cancelling")
+
+# None = batch ještě neskončil (cron to zkusí později); jinak (rozhodnutí, počet selhaných řádků,
+# id odeslaných rostlin). Stavový soubor maže volající až po výpisu → při chybě lze --collect zopakovat.
+async def collect_batch() -> Optional[tuple[list[DecisionResponse], int, list[str]]]:
+    state = load_json_or_default(BATCH_STATE_PATH, None, required=True)
+    client = _get_client()
+    batch = await client.batches.retrieve(state["batch_id"])
+    if batch.status in BATCH_RUNNING:
+        logging.info("Batch %s: %s", batch.id, batch.status)
+        return None
+    if not batch.output_file_id:
+        # failed / expired / cancelled without any output – nothing left to collect
+        os.remove(BATCH_STATE_PATH)
+        raise RuntimeError(f"Batch {batch.id} skončil stavem '{batch.status}' bez výsledků.")
+    if batch.status != "completed":
+        logging.warning("Batch %s skončil stavem '%s', zpracuji dílčí výsledky.", batch.id, batch.status)
+
+    output = await client.files.content(batch.output_file_id)
+    results, failed = [], 0
+    for line in output.text.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = orjson.loads(line)
+            resp = item.get("response") or {}
+            if item.get("error") or resp.get("status_code") != 200:
+                raise RuntimeError(item.get("error") or resp.get("body"))
+            results.extend(parse_decisions(resp["body"]["choices"][0]["message"]["content"]))
+        except Exception as e:
+            logging.error("Batch %s, řádek selhal: %s (%s)", batch.id, e, line[:200])
+            failed += 1
+    if batch.error_file_id:
+        logging.error("Batch %s: některé požadavky selhaly, viz soubor %s.", batch.id, batch.error_file_id)
+        failed += 1
+    # state files from before plant_ids were stored: trust what came back
+    plant_ids = state.get("plant_ids") or [r.id for r in results]
+    return results, failed, plant_ids
 
 # ---------- Logging ----------
 def setup_logging():
@@ -184,11 +418,11 @@ def setup_logging():
     logger.handlers = [sh, fh]
 
 # ---------- Consistency Guard ----------
-def consistency_guard(req: DecisionRequest, res: DecisionResponse) -> DecisionResponse:
-    dsl = days_since(req.last_watering_date) or 999
+def consistency_guard(req: DecisionRequest, res: DecisionResponse, now: datetime) -> DecisionResponse:
+    dsl = days_since(req._last_watering_day, now) or 999
     temp = req.weather_now.temp_c
     rh = req.weather_now.humidity_pct if req.weather_now.humidity_pct is not None else 100
-    rain12 = precip_sum_next_hours(req.weather_forecast, 12)
+    rain12 = rain_next_12h(req, now)
 
     hot = temp >= 30.0
     dry = rh <= 40.0
@@ -201,66 +435,221 @@ def consistency_guard(req: DecisionRequest, res: DecisionResponse) -> DecisionRe
         res.oduvodneni = f"{dsl} d od zálivky, {temp:.0f}°C/{int(rh)}% RH, déšť <2 mm/12h → raději zalij."
     return res
 
-# ---------- Main ----------
-def main():
-    setup_logging()
-
-    if not os.getenv("OPENAI_API_KEY"):
-        logging.error("Chybí OPENAI_API_KEY v prostředí.")
-        sys.exit(1)
-
-    # picture → data URL
-    try:
-        image_data_url = file_to_data_url(IMAGE_PATH)
-    except Exception as e:
-        logging.error("Chyba při čtení obrázku: %s", e)
-        sys.exit(1)
+# ---------- Fast Path ----------
+# Jednoznačné dny rozhodne pravidlo bez volání modelu; None = nejasné, rozhodne model.
+def fast_path(req: DecisionRequest, now: datetime) -> Optional[DecisionResponse]:
+    dsl = days_since(req._last_watering_day, now)
+    temp = req.weather_now.temp_c
+    rh = req.weather_now.humidity_pct if req.weather_now.humidity_pct is not None else 100
+    rain12 = rain_next_12h(req, now)
+
+    if dsl == 0:
+        return DecisionResponse(id=req.id, zalevat=False, oduvodneni="Zalito už dnes.")
+    if rain12 >= 5.0:
+        return DecisionResponse(id=req.id, zalevat=False,
+                                oduvodneni=f"Do 12 h čeká {rain12:.1f} mm srážek → nezalévat.")
+    if temp >= 30.0 and rh <= 40.0 and (dsl is None or dsl >= 1) and rain12 < 2.0:
+        since = f"{dsl} d od zálivky" if dsl is not None else "zálivka neznámá"
+        return DecisionResponse(id=req.id, zalevat=True,
+                                oduvodneni=f"{since}, {temp:.0f}°C/{int(rh)}% RH, déšť <2 mm/12h → zalij.")
+    return None
 
-    # JSON inputs
+# ---------- Main ----------
+# decisions in the order of expected plant ids (model/batch order isn't guaranteed) + undecided ids
+def order_results(results: list[DecisionResponse], ids: list[str]) -> tuple[list[DecisionResponse], list[str]]:
+    by_id = {r.id: r for r in results}
+    expected = set(ids)
+    unknown = [r.id for r in results if r.id not in expected]
+    if unknown:
+        logging.warning("Rozhodnutí pro neznámé rostliny ignorováno: %s", ", ".join(unknown))
+    return [by_id[i] for i in ids if i in by_id], [i for i in ids if i not in by_id]
+
+def plant_dirs() -> list[str]:
+    dirs = sorted(glob.glob(PLANTS_GLOB))
+    return dirs or ["./"]
+
+# no ./plants → the original single-plant layout, which keeps its original output format
+def single_plant_layout() -> bool:
+    return plant_dirs() == ["./"]
+
+def plant_id(plant_dir: str) -> str:
+    return os.path.basename(os.path.abspath(plant_dir))
+
+def load_request(plant_dir: str, wn: WeatherNow, wf: WeatherForecast) -> DecisionRequest:
+    plant_raw = load_json_or_default(os.path.join(plant_dir, PLANT_FILE), None, required=False)
+    history_raw = load_json_or_default(os.path.join(plant_dir, HISTORY_FILE), [], required=False)
+
+    # “last watered” – history is append-only, chronological → last record
+    last_date = None; last_amount = None
+    if history_raw:
+        last = history_raw[-1]
+        last_date = last.get("date")
+        last_amount = last.get("amount_ml")
+
+    req = DecisionRequest(
+        id=plant_id(plant_dir),
+        last_watering_date=last_date,
+        last_watering_amount_ml=last_amount,
+        weather_now=wn,
+        weather_forecast=wf,
+        plant=PlantContext(**plant_raw) if plant_raw else None
+    )
+    req._last_watering_day = parse_watering_day(last_date)
+    req._image_path = os.path.join(plant_dir, IMAGE_FILE)
+    req._hosted_image_url = (plant_raw or {}).get(IMAGE_URL_KEY)
+    return req
+
+# picture → hosted URL (if configured in plant.json), else data URL; only for model-bound plants
+def attach_image(req: DecisionRequest):
+    if req.image_url is None:
+        req.image_url = image_reference(req._image_path, req._hosted_image_url)
+
+# → (valid requests, ids of plants skipped for broken inputs – they count as undecided)
+def load_requests(now: datetime) -> tuple[list[DecisionRequest], list[str]]:
+    # shared weather inputs
     try:
         weather_now_raw = load_json_or_default(WEATHER_NOW_PATH, None, required=True)
         weather_forecast_raw = load_json_or_default(WEATHER_FORECAST_PATH, None, required=True)
-        plant_raw = load_json_or_default(PLANT_PATH, None, required=False)
-        history_raw = load_json_or_default(HISTORY_PATH, [], required=False)
     except Exception as e:
         logging.error("Chyba při načítání JSON: %s", e); sys.exit(1)
 
-    # validation + “last watered”
+    # only the upcoming head of a long (e.g. 168 h) forecast is ever used → don't validate the rest
+    if isinstance(weather_forecast_raw, dict) and isinstance(weather_forecast_raw.get("items"), list):
+        weather_forecast_raw["items"] = trim_forecast_items(weather_forecast_raw["items"], now)
+        if not weather_forecast_raw["items"]:
+            logging.warning("Předpověď neobsahuje žádné budoucí položky (stará data?).")
+
     try:
-        wn = WeatherNow(**weather_now_raw)
-        wf = WeatherForecast(**weather_forecast_raw)
-        plant = PlantContext(**plant_raw) if plant_raw else None
-
-        last_date = None; last_amount = None
-        if history_raw:
-            last = max(history_raw, key=lambda e: e.get("date",""))
-            last_date = last.get("date")
-            last_amount = last.get("amount_ml")
-
-        req = DecisionRequest(
-            image_url=image_data_url,
-            last_watering_date=last_date,
-            last_watering_amount_ml=last_amount,
-            weather_now=wn,
-            weather_forecast=wf,
-            plant=plant
-        )
+        wn = WeatherNow.model_validate(weather_now_raw)
+        wf = WeatherForecast.model_validate(weather_forecast_raw)
     except ValidationError as e:
-        logging.error("Neplatná data: %s", e); sys.exit(1)
+        logging.error("Neplatná data počasí: %s", e); sys.exit(1)
+
+    # per-plant inputs; a broken plant is skipped, not fatal for the others
+    reqs, skipped = [], []
+    for d in plant_dirs():
+        try:
+            reqs.append(load_request(d, wn, wf))
+        except Exception as e:
+            logging.error("Rostlina '%s' přeskočena: %s", plant_id(d), e)
+            skipped.append(plant_id(d))
+    if not reqs:
+        logging.error("Žádná rostlina s platnými daty."); sys.exit(1)
+    return reqs, skipped
+
+def emit(results: list[DecisionResponse], single: bool):
+    # single-plant layout: bare {"zalevat", "oduvodneni"} object as before; else list with ids
+    if single and len(results) == 1:
+        out = results[0].model_dump(exclude={"id"})
+    else:
+        out = [r.model_dump() for r in results]
+    print(orjson.dumps(out, option=orjson.OPT_INDENT_2).decode())
+    logging.info("RESPONSE: %s", orjson.dumps(out).decode())
+
+async def main():
+    ap = argparse.ArgumentParser(description="Rozhodnutí o zálivce rostlin.")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--batch", action="store_true",
+                      help="odeslat přes OpenAI Batch API (levnější, výsledek do 24 h)")
+    mode.add_argument("--collect", action="store_true",
+                      help="vyzvednout výsledek dříve odeslaného --batch")
+    args = ap.parse_args()
+
+    # one clock for the whole run → all plants/rules see the same "now" and "today"
+    now = datetime.now(LOCAL_TZ)
 
-    messages = build_messages(req)
+    setup_logging()
+    single = single_plant_layout()
+
+    if args.collect:
+        if not os.getenv("OPENAI_API_KEY"):
+            logging.error("Chybí OPENAI_API_KEY v prostředí.")
+            sys.exit(1)
+        try:
+            collected = await collect_batch()
+        except Exception as e:
+            logging.error("Chyba vyzvednutí batche: %s", e); sys.exit(1)
+        if collected is None:
+            return
+        results, failed, plant_ids = collected
+        results, missing = order_results(results, plant_ids)
+        if results:
+            emit(results, single)
+        os.remove(BATCH_STATE_PATH)
+        if missing:
+            logging.error("Bez rozhodnutí: %s", ", ".join(missing))
+        if failed or missing:
+            sys.exit(1)
+        return
+
+    reqs, skipped = load_requests(now)
+
+    # clear-cut plants are answered by rules, only the rest goes to the model
+    results, pending = [], []
+    for r in reqs:
+        res = fast_path(r, now)
+        if res is not None:
+            logging.info("Rostlina '%s': rozhodnuto pravidlem (bez modelu).", r.id)
+            results.append(res)
+        else:
+            logging.info("Rostlina '%s': rozhodne model.", r.id)
+            pending.append(r)
 
-    try:
-        res = call_openai(messages, model=MODEL)
-    except Exception as e:
-        logging.error("Chyba volání OpenAI: %s", e); sys.exit(1)
+    # the key (and the photos) are only needed when something goes to the model
+    if pending and not os.getenv("OPENAI_API_KEY"):
+        logging.error("Chybí OPENAI_API_KEY v prostředí.")
+        if results:
+            emit(results, single)
+        sys.exit(1)
 
-    # kconsistency_guard
-    # res = consistency_guard(req, res)
+    no_image = []
+    for r in list(pending):
+        try:
+            attach_image(r)
+        except Exception as e:
+            logging.error("Rostlina '%s' přeskočena, chyba při čtení obrázku: %s", r.id, e)
+            pending.remove(r)
+            no_image.append(r.id)
+    groups = [pending[i:i + PLANTS_PER_CALL] for i in range(0, len(pending), PLANTS_PER_CALL)]
+
+    if args.batch:
+        if results:
+            emit(results, single)
+        if groups:
+            try:
+                batch_id = await submit_batch(groups, model=MODEL, now=now)
+            except Exception as e:
+                logging.error("Chyba odeslání batche: %s", e); sys.exit(1)
+            logging.info("Batch %s odeslán (%d rostlin), vyzvedni přes --collect.", batch_id, len(pending))
+        if skipped or no_image:
+            logging.error("Bez rozhodnutí: %s", ", ".join(skipped + no_image))
+            sys.exit(1)
+        return
+
+    outcomes = await asyncio.gather(
+        *[call_openai(build_messages(g, now), model=MODEL) for g in groups],
+        return_exceptions=True,
+    )
+
+    for g, o in zip(groups, outcomes):
+        if isinstance(o, Exception):
+            logging.error("Chyba volání OpenAI (%s): %s", ", ".join(r.id for r in g), o)
+        else:
+            results.extend(o)
 
-    # output
-    print(json.dumps(res.model_dump(), ensure_ascii=False, indent=2))
-    logging.info("RESPONSE: %s", json.dumps(res.model_dump(), ensure_ascii=False))
+    results, missing = order_results(results, [r.id for r in reqs])
+    missing = skipped + missing
+
+    # kconsistency_guard
+    # req_by_id = {r.id: r for r in reqs}
+    # results = [consistency_guard(req_by_id[res.id], res, now) for res in results]
+
+    # output – partial results still printed, but cron must see the failure
+    if results:
+        emit(results, single)
+    if missing:
+        logging.error("Bez rozhodnutí: %s", ", ".join(missing))
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())